@@ -0,0 +1,148 @@
+# alerts.py - Server-side incremental alerting over region ticks
+
+import numpy as np
+from pymongo import UpdateOne
+from regions import RESOURCES
+
+# Published transitions are kept this long (TTL index on "t"); active state lives separately
+ALERT_RETENTION_SECONDS = 7 * 24 * 3600
+
+# Declarative rules. A "threshold" rule fires when the metric crosses `threshold` (per `op`) and
+# clears only once it is back past `clear`, so values hovering at the threshold don't flap.
+# A "rate" rule applies the same logic to the metric's change since the previous tick.
+RULES = [
+    {"name": "severity_critical", "metric": "severity", "kind": "threshold", "op": ">", "threshold": 70, "clear": 65, "level": "CRITICAL"},
+    {"name": "severity_high", "metric": "severity", "kind": "threshold", "op": ">", "threshold": 50, "clear": 45, "level": "HIGH"},
+    {"name": "severity_moderate", "metric": "severity", "kind": "threshold", "op": ">", "threshold": 30, "clear": 25, "level": "MODERATE"},
+    {"name": "severity_rising", "metric": "severity", "kind": "rate", "op": ">", "threshold": 10, "clear": 2, "level": "HIGH"},
+    {"name": "roads_severe", "metric": "blocks", "kind": "threshold", "op": ">", "threshold": 3, "clear": 2, "level": "CRITICAL"},
+    {"name": "roads_moderate", "metric": "blocks", "kind": "threshold", "op": ">", "threshold": 1, "clear": 0, "level": "HIGH"}
+] + [
+    rule
+    for res in RESOURCES
+    for rule in (
+        {"name": f"{res}_critical", "metric": f"days_{res}", "kind": "threshold", "op": "<", "threshold": 2, "clear": 2.5, "level": "CRITICAL"},
+        {"name": f"{res}_urgent", "metric": f"days_{res}", "kind": "threshold", "op": "<", "threshold": 3, "clear": 3.5, "level": "HIGH"},
+        {"name": f"{res}_low", "metric": f"days_{res}", "kind": "threshold", "op": "<", "threshold": 4, "clear": 4.5, "level": "MODERATE"}
+    )
+]
+
+
+def tick_metrics(docs):
+    """Region ids and metric arrays from one tick of compact documents"""
+    region_ids = np.array([doc["r"] for doc in docs], dtype=np.int64)
+    stocks = np.array([doc["w"] for doc in docs], dtype=np.float64).reshape(len(docs), len(RESOURCES))
+    needs = np.array([doc["q"] for doc in docs], dtype=np.float64).reshape(len(docs), len(RESOURCES))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        days_left = np.where(needs > 0, stocks / needs, np.inf)
+
+    values = {
+        "severity": np.array([doc.get("s", 0.0) for doc in docs], dtype=np.float64),
+        "blocks": np.array([doc["b"] for doc in docs], dtype=np.float64)
+    }
+    for i, res in enumerate(RESOURCES):
+        values[f"days_{res}"] = days_left[:, i]
+    return region_ids, values
+
+
+class AlertEngine:
+    """Evaluates all rules over all regions once per tick and publishes only state transitions"""
+
+    def __init__(self, collection=None, rules=RULES, retention_seconds=ALERT_RETENTION_SECONDS):
+        self.collection = collection
+        self.rules = rules
+        self.rule_index = {rule["name"]: j for j, rule in enumerate(rules)}
+        self.active = np.zeros((0, len(rules)), dtype=bool)
+        self.previous = {}
+
+        # One small document per (region, rule) holding whether that alert is active
+        self.state_collection = None
+        if self.collection is not None:
+            self.state_collection = self.collection.database[f"{self.collection.name}_state"]
+            # Separate so a failed index creation never skips restoring the active state
+            try:
+                self.collection.create_index([("t", 1)], expireAfterSeconds=retention_seconds)
+            except Exception as e:
+                print(f"Error creating alert TTL index: {e}")
+            try:
+                self.load_state()
+            except Exception as e:
+                print(f"Error loading alert state: {e}")
+
+    def _ensure_regions(self, count):
+        if count > len(self.active):
+            grown = np.zeros((count, len(self.rules)), dtype=bool)
+            grown[:len(self.active)] = self.active
+            self.active = grown
+
+    def load_state(self):
+        """Restore active alerts from the per-(region, rule) state documents"""
+        for entry in self.state_collection.find({"active": True}, {"r": 1, "rule": 1}):
+            j = self.rule_index.get(entry["rule"])
+            if j is not None:
+                self._ensure_regions(entry["r"] + 1)
+                self.active[entry["r"], j] = True
+
+    def evaluate(self, docs, timestamp):
+        """Update alert state from one tick and return the transitions"""
+        if not docs:
+            return []
+        region_ids, values = tick_metrics(docs)
+        self._ensure_regions(int(region_ids.max()) + 1)
+
+        # Previous values aligned to this tick's regions (NaN where unknown)
+        rates = {}
+        for metric, current in values.items():
+            previous = np.full(len(self.active), np.nan)
+            if metric in self.previous:
+                prev_ids, prev_values = self.previous[metric]
+                previous[prev_ids] = prev_values
+            rates[metric] = current - previous[region_ids]
+
+        transitions = []
+        for j, rule in enumerate(self.rules):
+            value = rates[rule["metric"]] if rule["kind"] == "rate" else values[rule["metric"]]
+            with np.errstate(invalid="ignore"):
+                if rule["op"] == ">":
+                    fire = value > rule["threshold"]
+                    clear = value <= rule["clear"]
+                else:
+                    fire = value < rule["threshold"]
+                    clear = value >= rule["clear"]
+
+            was_active = self.active[region_ids, j]
+            now_active = np.where(was_active, ~clear, fire)
+            self.active[region_ids, j] = now_active
+
+            for idx in np.flatnonzero(now_active != was_active):
+                transitions.append({
+                    "r": int(region_ids[idx]),
+                    "rule": rule["name"],
+                    "level": rule["level"],
+                    "state": "raised" if now_active[idx] else "cleared",
+                    "value": float(value[idx]),
+                    "t": timestamp
+                })
+
+        self.previous = {metric: (region_ids, current) for metric, current in values.items()}
+        return transitions
+
+    def process(self, docs, timestamp):
+        """Evaluate a tick and publish its transitions"""
+        transitions = self.evaluate(docs, timestamp)
+        if transitions and self.collection is not None:
+            self.state_collection.bulk_write([
+                UpdateOne(
+                    {"_id": f"{transition['r']}:{transition['rule']}"},
+                    {"$set": {
+                        "r": transition["r"],
+                        "rule": transition["rule"],
+                        "active": transition["state"] == "raised",
+                        "t": transition["t"]
+                    }},
+                    upsert=True
+                )
+                for transition in transitions
+            ], ordered=False)
+            self.collection.insert_many(transitions)
+        return transitions
@@ -2,27 +2,54 @@ import streamlit as st
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
+import numpy as np
 from pymongo import MongoClient
 from datetime import datetime, timedelta
+import os
 import time
+from metrics import record_tick, start_metrics_server, timed
+from regions import RESOURCES, load_catalog
+from schema import decode_tick
+from snapshot import SnapshotStore
+
+# Current-state collection shown by the dashboard, and the alerts published by its writer.
+# gan_data (gan_generator.py) resamples every tick; synthetic_data (gan_model.py) evolves over
+# time and also carries severity slope and stock-out forecasts.
+DASHBOARD_SOURCES = {
+    "gan_data": "alerts",
+    "synthetic_data": "synthetic_alerts"
+}
+DASHBOARD_SOURCE = os.environ.get("RRAI_DASHBOARD_SOURCE", "gan_data")
+if DASHBOARD_SOURCE not in DASHBOARD_SOURCES:
+    print(f"Unknown RRAI_DASHBOARD_SOURCE {DASHBOARD_SOURCE!r}, using gan_data")
+    DASHBOARD_SOURCE = "gan_data"
 
 try:
     client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
     db = client["resource_allocation"]
-    synthetic_collection = db["gan_data"]  
+    synthetic_collection = db[DASHBOARD_SOURCE]
+    synthetic_snapshots = SnapshotStore(db, DASHBOARD_SOURCE)
+    alerts_collection = db[DASHBOARD_SOURCES[DASHBOARD_SOURCE]]
     print("Connected to MongoDB successfully!")
 except Exception as e:
     st.error(f"Failed to connect to MongoDB: {e}")
     synthetic_collection = None  # Set to None if connection fails
+    synthetic_snapshots = None
+    alerts_collection = None
 
-# City coordinates
-CITY_COORDINATES = {
-    "Delhi": {"lat": 28.6139, "lon": 77.2090},
-    "Mumbai": {"lat": 19.0760, "lon": 72.8777},
-    "Chennai": {"lat": 13.0827, "lon": 80.2707},
-    "Hyderabad": {"lat": 17.3850, "lon": 78.4867},
-    "Bangalore": {"lat": 12.9716, "lon": 77.5946}
-}
+# Local metrics endpoint (started once per Streamlit server process)
+start_metrics_server(9103)
+
+# Region catalog (names, coordinates) shared with the generators
+CATALOG = load_catalog()
+
+# Map level of detail: clusters are grid cells of about CLUSTER_CELL_PX pixels at the current zoom,
+# and the viewport is assumed to span VIEWPORT_TILES (width, height) 256px map tiles
+CLUSTER_CELL_PX = 60
+VIEWPORT_TILES = (5, 1.6)
+MAX_TRAIL_REGIONS = 20
+DEFAULT_MAP_ZOOM = 4
+DEFAULT_MAP_CENTER = {'lat': 20.5937, 'lon': 78.9629}  # Center of India
 
 # Map styles
 MAP_STYLES = {
@@ -71,6 +98,10 @@ if 'selected_map_view' not in st.session_state:
     st.session_state.selected_map_view = 'severity'
 if 'map_style' not in st.session_state:
     st.session_state.map_style = 'Basic'
+if 'map_zoom' not in st.session_state:
+    st.session_state.map_zoom = DEFAULT_MAP_ZOOM
+if 'map_center' not in st.session_state:
+    st.session_state.map_center = DEFAULT_MAP_CENTER
 
 def load_data():
     """Load data from MongoDB and validate structure"""
@@ -79,7 +110,7 @@ def load_data():
         return pd.DataFrame()
     
     try:
-        data = list(synthetic_collection.find({}, {'_id': 0}))
+        data = [decode_tick(doc) for doc in synthetic_collection.find({}, {'_id': 0})]
         df = pd.DataFrame(data)
         
         # Validate required columns
@@ -98,46 +129,53 @@ def load_data():
         st.error(f"Data loading error: {e}")
         return pd.DataFrame()
 
-def get_marker_properties(row, view_type):
-    """Get marker properties based on selected view"""
-    if view_type == 'severity':
-        score = row['severity_score']
-        if score > 70:
-            return 'rgba(255,0,0,0.6)', f"Severity: {score:.1f}"
-        elif score > 50:
-            return 'rgba(255,165,0,0.6)', f"Severity: {score:.1f}"
-        elif score > 30:
-            return 'rgba(255,255,0,0.6)', f"Severity: {score:.1f}"
-        return 'rgba(0,255,0,0.6)', f"Severity: {score:.1f}"
-    
-    elif view_type in ['food', 'medical', 'water']:
-        stock = row['warehouse_stock_status'][view_type]
-        need = row['resource_needs'][view_type]
-        days_left = stock / need if need > 0 else float('inf')
-        if days_left < 2:
-            return 'rgba(255,0,0,0.6)', f"{view_type.capitalize()}: {days_left:.1f} days left"
-        elif days_left < 4:
-            return 'rgba(255,165,0,0.6)', f"{view_type.capitalize()}: {days_left:.1f} days left"
-        return 'rgba(0,255,0,0.6)', f"{view_type.capitalize()}: {days_left:.1f} days left"
-    
-    elif view_type == 'roads':
-        blocks = row['road_block_status']
-        if blocks > 3:
-            return 'rgba(255,0,0,0.6)', f"Blocked roads: {blocks}"
-        elif blocks > 1:
-            return 'rgba(255,165,0,0.6)', f"Blocked roads: {blocks}"
-        return 'rgba(0,255,0,0.6)', f"Blocked roads: {blocks}"
+def severity_color(score):
+    if score > 70:
+        return 'rgba(255,0,0,0.6)'
+    elif score > 50:
+        return 'rgba(255,165,0,0.6)'
+    elif score > 30:
+        return 'rgba(255,255,0,0.6)'
+    return 'rgba(0,255,0,0.6)'
+
+def days_left_color(days_left):
+    if days_left < 2:
+        return 'rgba(255,0,0,0.6)'
+    elif days_left < 4:
+        return 'rgba(255,165,0,0.6)'
+    return 'rgba(0,255,0,0.6)'
+
+def roads_color(blocks):
+    if blocks > 3:
+        return 'rgba(255,0,0,0.6)'
+    elif blocks > 1:
+        return 'rgba(255,165,0,0.6)'
+    return 'rgba(0,255,0,0.6)'
 
 # Added caching and error handling
 @st.cache_data(ttl=10, show_spinner=False)
 def load_data():
     try:
-        data = list(synthetic_collection.find({}, {'_id': 0}).sort('timestamp', -1).limit(5))
-        return pd.DataFrame(data)
+        with timed("storage_read"):
+            # Complete current tick: one indexed query on the snapshot version
+            docs = synthetic_snapshots.read({'_id': 0})
+            return pd.DataFrame([decode_tick(doc) for doc in docs])
     except Exception as e:
         st.error(f"Data loading error: {e}")
         return pd.DataFrame()
 
+@st.cache_data(ttl=3, show_spinner=False)
+def load_alerts(limit=20):
+    """Load the most recent alert transitions published by the generator"""
+    if alerts_collection is None:
+        return []
+    try:
+        with timed("storage_read_alerts"):
+            return list(alerts_collection.find({}, {'_id': 0}).sort('t', -1).limit(limit))
+    except Exception as e:
+        st.error(f"Alert loading error: {e}")
+        return []
+
 # Added time range selector
 def time_filtered_data(df):
     default_end = datetime.now()
@@ -164,25 +202,95 @@ def load_historical_data(hours=24):
         start_time = end_time - timedelta(hours=hours)
         
         # Query for historical data
-        history_data = list(synthetic_collection.find({
-            "timestamp": {
-                "$gte": start_time,
-                "$lte": end_time
-            }
-        }, {'_id': 0}))
+        with timed("storage_read_history"):
+            history_data = [decode_tick(doc) for doc in synthetic_collection.find({
+                "t": {
+                    "$gte": start_time,
+                    "$lte": end_time
+                }
+            }, {'_id': 0})]
         
         # Convert to DataFrame and add coordinates
         df = pd.DataFrame(history_data)
         if not df.empty:
-            df['lat'] = df['region_name'].map(lambda x: CITY_COORDINATES[x]['lat'])
-            df['lon'] = df['region_name'].map(lambda x: CITY_COORDINATES[x]['lon'])
+            region_ids = df['region_id'].to_numpy()
+            df['lat'] = CATALOG.lat[region_ids]
+            df['lon'] = CATALOG.lon[region_ids]
         
         return df
     except Exception as e:
         st.error(f"Error loading historical data: {e}")
         return pd.DataFrame()
 
-def create_map(df):
+def viewport_bounds(center_lat, center_lon, zoom):
+    """Approximate lat/lon bounds visible in the map at the given center and zoom"""
+    tile_degrees = 360 / 2 ** zoom
+    half_lon = tile_degrees * VIEWPORT_TILES[0] / 2
+    half_lat = tile_degrees * VIEWPORT_TILES[1] / 2
+    return (center_lat - half_lat, center_lat + half_lat, center_lon - half_lon, center_lon + half_lon)
+
+@st.cache_data(max_entries=64, show_spinner=False)
+def cluster_regions(_df, tick_key, zoom):
+    """Aggregate one tick's regions into grid cells sized for the zoom level.
+
+    Cached per (tick, zoom) so panning or switching views only filters the cached clusters.
+    """
+    region_ids = _df['region_id'].to_numpy()
+    stocks = np.array([[s[res] for res in RESOURCES] for s in _df['warehouse_stock_status']], dtype=float)
+    needs = np.array([[n[res] for res in RESOURCES] for n in _df['resource_needs']], dtype=float)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        days_left = np.where(needs > 0, stocks / needs, np.inf)
+
+    frame = pd.DataFrame({
+        'name': _df['region_name'].to_numpy(),
+        'lat': CATALOG.lat[region_ids],
+        'lon': CATALOG.lon[region_ids],
+        'severity': _df['severity_score'].to_numpy(dtype=float),
+        'blocks': _df['road_block_status'].to_numpy(),
+        'days_left': days_left.min(axis=1)
+    })
+    for i, res in enumerate(RESOURCES):
+        frame[f'days_{res}'] = days_left[:, i]
+    if 'stockout_eta_hours' in _df.columns:
+        eta = np.array([[e[res] for res in RESOURCES] if isinstance(e, dict) else [np.inf] * len(RESOURCES)
+                        for e in _df['stockout_eta_hours']], dtype=float)
+        frame['stockout_eta'] = eta.min(axis=1)
+    else:
+        frame['stockout_eta'] = np.inf
+
+    cell = CLUSTER_CELL_PX / 256 * 360 / 2 ** zoom
+    frame['cell_x'] = np.floor(frame['lon'] / cell).astype(int)
+    frame['cell_y'] = np.floor(frame['lat'] / cell).astype(int)
+
+    aggregations = dict(
+        name=('name', 'first'),
+        regions=('name', 'size'),
+        lat=('lat', 'mean'),
+        lon=('lon', 'mean'),
+        severity=('severity', 'max'),
+        blocks=('blocks', 'max'),
+        days_left=('days_left', 'min'),
+        stockout_eta=('stockout_eta', 'min')
+    )
+    for res in RESOURCES:
+        aggregations[f'days_{res}'] = (f'days_{res}', 'min')
+    return frame.groupby(['cell_x', 'cell_y']).agg(**aggregations).reset_index(drop=True)
+
+def visible_clusters(clusters, bounds):
+    """Keep only clusters inside the viewport"""
+    lat_min, lat_max, lon_min, lon_max = bounds
+    inside = clusters['lat'].between(lat_min, lat_max) & clusters['lon'].between(lon_min, lon_max)
+    return clusters[inside]
+
+def cluster_marker_colors(clusters, view_type):
+    """Marker colors for clusters using the same thresholds as single regions"""
+    if view_type == 'severity':
+        return [severity_color(v) for v in clusters['severity']]
+    elif view_type in RESOURCES:
+        return [days_left_color(v) for v in clusters[f'days_{view_type}']]
+    return [roads_color(v) for v in clusters['blocks']]
+
+def create_map(df, view_type='severity', map_style='Basic', zoom=DEFAULT_MAP_ZOOM, center=DEFAULT_MAP_CENTER):
     """Create an interactive map with resource status indicators"""
     if df.empty or 'region_name' not in df.columns:
         st.warning("No valid data available for map visualization.")
@@ -190,28 +298,29 @@ def create_map(df):
     
     fig = go.Figure()
     
-    # Add historical trajectory layer if data exists
-    try:
-        history_df = load_historical_data(hours=6)  # Last 6 hours of data
-        if not history_df.empty and 'region_name' in history_df.columns:
-            for city in df['region_name'].unique():
-                city_df = history_df[history_df['region_name'] == city]
-                if not city_df.empty:
-                    fig.add_trace(go.Scattermapbox(
-                        lat=city_df['lat'],
-                        lon=city_df['lon'],
-                        mode='lines+markers',
-                        marker=dict(size=8, color='rgba(100,100,100,0.5)'),
-                        line=dict(width=1, color='gray'),
-                        name=f"{city} Trend",
-                        hoverinfo='none',
-                        showlegend=True
-                    ))
-    except Exception as e:
-        st.warning(f"Could not add historical data: {e}")
+    # Add historical trajectory layer if data exists (skipped for large region counts)
+    if len(df) <= MAX_TRAIL_REGIONS:
+        try:
+            history_df = load_historical_data(hours=6)  # Last 6 hours of data
+            if not history_df.empty and 'region_name' in history_df.columns:
+                for city in df['region_name'].unique():
+                    city_df = history_df[history_df['region_name'] == city]
+                    if not city_df.empty:
+                        fig.add_trace(go.Scattermapbox(
+                            lat=city_df['lat'],
+                            lon=city_df['lon'],
+                            mode='lines+markers',
+                            marker=dict(size=8, color='rgba(100,100,100,0.5)'),
+                            line=dict(width=1, color='gray'),
+                            name=f"{city} Trend",
+                            hoverinfo='none',
+                            showlegend=True
+                        ))
+        except Exception as e:
+            st.warning(f"Could not add historical data: {e}")
     
     # Add legend traces
-    legend_colors = COLOR_MAPPINGS[st.session_state.selected_map_view]
+    legend_colors = COLOR_MAPPINGS[view_type]
     for color, label in legend_colors.items():
         rgba_color = color.replace('red', 'rgba(255,0,0,0.6)')\
                          .replace('orange', 'rgba(255,165,0,0.6)')\
@@ -227,42 +336,48 @@ def create_map(df):
             showlegend=True
         ))
     
-    # Add city markers
-    for _, row in df.iterrows():
-        if 'region_name' not in row or row['region_name'] not in CITY_COORDINATES:
-            continue  # Skip invalid rows
-        
-        city_name = row['region_name']
-        coords = CITY_COORDINATES[city_name]
-        
-        color, status_text = get_marker_properties(row, st.session_state.selected_map_view)
-        
-        hover_text = f"<b>{city_name}</b><br>{status_text}<br>"
+    # Add region markers, clustered to the current zoom level and viewport
+    valid = df[df['region_name'].isin(CATALOG.index)]
+    if not valid.empty:
+        if 'timestamp' in valid.columns:
+            tick_key = str(valid['timestamp'].max())
+        else:
+            tick_key = str(pd.util.hash_pandas_object(valid[['region_id', 'severity_score']]).sum())
+        clusters = cluster_regions(valid, tick_key, zoom)
+        clusters = visible_clusters(clusters, viewport_bounds(center['lat'], center['lon'], zoom))
+
+        hover_text = [
+            (f"<b>{row.name}</b>" if row.regions == 1 else f"<b>{row.regions} regions</b>") +
+            f"<br>Max severity: {row.severity:.1f}<br>Worst days left: {row.days_left:.1f}"
+            f"<br>Blocked roads: {row.blocks}<br>" +
+            (f"Earliest stock-out: {row.stockout_eta:.0f} h<br>" if np.isfinite(row.stockout_eta) else "")
+            for row in clusters.itertuples()
+        ]
         
         fig.add_trace(go.Scattermapbox(
-            lat=[coords['lat']],
-            lon=[coords['lon']],
+            lat=clusters['lat'],
+            lon=clusters['lon'],
             mode='markers',
             marker=dict(
-                size=20,
-                color=color,
+                size=20 + 4 * np.log2(clusters['regions']),
+                color=cluster_marker_colors(clusters, view_type),
                 showscale=False
             ),
-            text=[hover_text],
+            text=hover_text,
             hoverinfo='text',
             hoverlabel=dict(
                 bgcolor='white',
                 font=dict(color='black')
             ),
-            name=city_name,
+            name='Regions',
             showlegend=False
         ))
     
     fig.update_layout(
         mapbox=dict(
-            style=MAP_STYLES[st.session_state.map_style],
-            center=dict(lat=20.5937, lon=78.9629),  # Center of India
-            zoom=4
+            style=MAP_STYLES[map_style],
+            center=center,
+            zoom=zoom
         ),
         margin=dict(l=0, r=0, t=0, b=0),
         height=400,
@@ -313,14 +428,18 @@ def calculate_resource_recommendations(df):
         urgent_resources = []
         stocks = row['warehouse_stock_status']
         needs = row['resource_needs']
+        etas = row.get('stockout_eta_hours')
         
         for resource in stocks.keys():
             days_left = stocks[resource] / needs[resource] if needs[resource] > 0 else float('inf')
             if days_left < 3:
+                forecast = ""
+                if isinstance(etas, dict) and etas[resource] != float('inf'):
+                    forecast = f", stock-out in {etas[resource]:.0f} h at current trend"
                 urgent_resources.append(
                     f"{resource} (Stock: {stocks[resource]}, "
                     f"Need: {needs[resource]}, "
-                    f"{days_left:.1f} days left)"
+                    f"{days_left:.1f} days left{forecast})"
                 )
         
         priority = "CRITICAL" if row['severity_score'] > 70 else \
@@ -356,6 +475,11 @@ def main():
         options=['severity', 'food', 'water', 'medical', 'roads'],
         format_func=lambda x: x.capitalize()
     )
+
+    st.session_state.map_zoom = st.sidebar.slider("Map Zoom", min_value=2, max_value=12, value=DEFAULT_MAP_ZOOM)
+    center_lat = st.sidebar.number_input("Center Latitude", value=DEFAULT_MAP_CENTER['lat'], min_value=-85.0, max_value=85.0)
+    center_lon = st.sidebar.number_input("Center Longitude", value=DEFAULT_MAP_CENTER['lon'], min_value=-180.0, max_value=180.0)
+    st.session_state.map_center = {'lat': center_lat, 'lon': center_lon}
     
     # Create a container for the main content
     main_container = st.container()
@@ -363,6 +487,8 @@ def main():
     with main_container:
         # Load new data
         df = load_data()
+        # Staleness of the data this render shows, including time spent in the load_data cache
+        record_tick("dashboard", df['timestamp'].max() if 'timestamp' in df.columns else None)
         
         # Top metrics row
         col1, col2, col3, col4 = st.columns(4)
@@ -370,13 +496,18 @@ def main():
             st.metric("Regions Monitored", len(df))
         with col2:
             current_severity = df['severity_score'].mean()
-            if st.session_state.previous_data is not None:
-                previous_severity = st.session_state.previous_data['severity_score'].mean()
-                delta = current_severity - previous_severity
+            # synthetic_data carries an EWMA severity slope per region (points per minute);
+            # for gan_data fall back to the change since the previous render
+            if 'severity_slope' in df.columns:
+                delta = df['severity_slope'].mean()
+                delta_text = f"{delta:.1f}/min"
+            elif st.session_state.previous_data is not None:
+                delta = current_severity - st.session_state.previous_data['severity_score'].mean()
+                delta_text = f"{delta:.1f}"
             else:
                 delta = None
             st.metric("Average Severity", f"{current_severity:.1f}", 
-                      delta=f"{delta:.1f}" if delta else None)
+                      delta=delta_text if pd.notna(delta) else None)
         with col3:
             blocked_roads = df['road_block_status'].sum()
             st.metric("Blocked Roads", blocked_roads)
@@ -386,7 +517,14 @@ def main():
 
         # Add the map
         st.subheader(f"📍 Real-time {st.session_state.selected_map_view.capitalize()} Status Map")
-        fig_map = create_map(df)
+        with timed("figure_map", batch_size=len(df)):
+            fig_map = create_map(
+                df,
+                view_type=st.session_state.selected_map_view,
+                map_style=st.session_state.map_style,
+                zoom=st.session_state.map_zoom,
+                center=st.session_state.map_center
+            )
         st.plotly_chart(fig_map, use_container_width=True)
 
         # Create two columns for main visualizations
@@ -394,24 +532,27 @@ def main():
 
         with col_left:
             # Severity Chart
-            fig_severity = px.bar(
-                df,
-                x='region_name',
-                y='severity_score',
-                color='severity_score',
-                color_continuous_scale='RdYlGn_r',
-                title='Regional Severity Scores'
-            )
+            with timed("figure_severity", batch_size=len(df)):
+                fig_severity = px.bar(
+                    df,
+                    x='region_name',
+                    y='severity_score',
+                    color='severity_score',
+                    color_continuous_scale='RdYlGn_r',
+                    title='Regional Severity Scores'
+                )
             st.plotly_chart(fig_severity, use_container_width=True)
 
             # Resource Status
-            fig_resources = create_resource_chart(df)
+            with timed("figure_resources", batch_size=len(df)):
+                fig_resources = create_resource_chart(df)
             st.plotly_chart(fig_resources, use_container_width=True)
 
         with col_right:
             # Critical Recommendations
             st.subheader("📊 Situation Analysis")
-            recommendations = calculate_resource_recommendations(df)
+            with timed("allocation", batch_size=len(df)):
+                recommendations = calculate_resource_recommendations(df)
             
             for rec in recommendations:
                 color = {
@@ -430,6 +571,18 @@ def main():
                 </div>
                 """, unsafe_allow_html=True)
 
+            # Alert transitions from the server-side rules engine
+            st.subheader("🚨 Recent Alerts")
+            alerts = load_alerts()
+            if not alerts:
+                st.markdown("No alerts")
+            for alert in alerts:
+                icon = "🔴" if alert["state"] == "raised" else "✅"
+                st.markdown(
+                    f"{icon} **{CATALOG.name_of(alert['r'])}** · {alert['rule']} ({alert['level']}) "
+                    f"{alert['state']} at {alert['t'].strftime('%H:%M:%S')}"
+                )
+
         # Add timestamp
         st.markdown(f"Last updated: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
 
@@ -1,82 +1,138 @@
+import argparse
+import os
 import tensorflow as tf
 import numpy as np
 from pymongo import MongoClient
 import time
 from datetime import datetime
+from alerts import AlertEngine
+from metrics import record_tick, start_metrics_server, timed
+from regions import load_catalog
+from schema import RESOURCES, encode_arrays
+from snapshot import SnapshotStore
+
+GENERATOR_WEIGHTS = "gan_generator_weights.h5"
+NOISE_DIM = 5
+NUM_METRICS = 3
+INFERENCE_BATCH = 65536
 
 class GANGenerator:
-    def __init__(self):
+    def __init__(self, load_weights=True):
         # Initialize MongoDB connection
         try:
             self.client = MongoClient("mongodb://localhost:27017/", serverSelectionTimeoutMS=5000)
             self.db = self.client["resource_allocation"]
             self.collection = self.db["gan_data"]
+            self.snapshots = SnapshotStore(self.db, "gan_data")
         except Exception as e:
             print(f"Error connecting to MongoDB: {e}")
             self.client = None
             self.db = None
             self.collection = None
+            self.snapshots = None
         
+        # Shared region catalog; the generator emits one 3-metric row per region
+        self.catalog = load_catalog()
+
         # Generator Network
         self.generator = tf.keras.Sequential([
-            tf.keras.layers.Dense(128, activation='leaky_relu', input_shape=(5,)),
+            tf.keras.layers.Dense(128, activation='leaky_relu', input_shape=(NOISE_DIM,)),
             tf.keras.layers.BatchNormalization(),
             tf.keras.layers.Dense(64, activation='leaky_relu'),
             tf.keras.layers.Dropout(0.2),
-            tf.keras.layers.Dense(15)  # 5 cities * 3 metrics each
+            tf.keras.layers.Dense(NUM_METRICS)  # population, road blocks, severity per region
         ])
         
         # Discriminator Network
         self.discriminator = tf.keras.Sequential([
-            tf.keras.layers.Dense(64, activation='leaky_relu', input_shape=(15,)),
+            tf.keras.layers.Dense(64, activation='leaky_relu', input_shape=(NUM_METRICS,)),
             tf.keras.layers.Dense(32, activation='leaky_relu'),
             tf.keras.layers.Dense(1, activation='sigmoid')
         ])
         
         # Combined Network
         self.combined = tf.keras.Sequential([self.generator, self.discriminator])
-        
-        self.city_templates = {
-            "Delhi": {"base_population": 250000, "base_resources": {"food": 2000, "water": 3000, "medical": 1000}},
-            "Mumbai": {"base_population": 300000, "base_resources": {"food": 2500, "water": 3500, "medical": 1200}},
-            "Chennai": {"base_population": 200000, "base_resources": {"food": 1800, "water": 2800, "medical": 900}},
-            "Hyderabad": {"base_population": 180000, "base_resources": {"food": 1600, "water": 2600, "medical": 800}},
-            "Bangalore": {"base_population": 220000, "base_resources": {"food": 2000, "water": 3000, "medical": 1000}}
-        }
+
+        # Trained weights from train_gan.py
+        if load_weights and os.path.exists(GENERATOR_WEIGHTS):
+            try:
+                self.generator.load_weights(GENERATOR_WEIGHTS)
+                print(f"Loaded generator weights from {GENERATOR_WEIGHTS}")
+            except Exception as e:
+                print(f"Error loading generator weights: {e}")
 
     def generate(self):
-            
-        noise = np.random.normal(0, 1, (1, 5))
-        gan_output = self.generator.predict(noise, verbose=0)[0]
-        
-        synthetic_data = []
-        for idx in range(5):  # 5 cities
-            city_name = list(self.city_templates.keys())[idx]
-            base_pop = self.city_templates[city_name]["base_population"]
-            
-            data_point = {
-                "region_id": idx,
-                "region_name": city_name,
-                "population_density": int(abs(gan_output[idx*3] * 50000) + base_pop),
-                "road_block_status": int(abs(gan_output[idx*3 + 1] * 5)),
-                "severity_score": float(abs(gan_output[idx*3 + 2] * 100)),
-                "warehouse_stock_status": self._generate_stocks(city_name),
-                "resource_needs": self._generate_needs(city_name),
-                "timestamp": datetime.now()
-            }
-            synthetic_data.append(data_point)
-        
-        return synthetic_data
+        return encode_arrays(self.generate_arrays(1), datetime.now())
+
+    def _sample(self, rows):
+        """Run the generator over rows noise vectors in fixed-size batches"""
+        outputs = []
+        for start in range(0, rows, INFERENCE_BATCH):
+            noise = np.random.normal(0, 1, (min(INFERENCE_BATCH, rows - start), NOISE_DIM)).astype(np.float32)
+            outputs.append(self.generator(noise, training=False).numpy())
+        return np.concatenate(outputs)
 
-    def _generate_stocks(self, city_name):
-        base = self.city_templates[city_name]["base_resources"]
-        return {k: v * np.random.uniform(0.5, 1.5) for k, v in base.items()}
+    def generate_arrays(self, num_ticks):
+        """Generate num_ticks ticks for all regions as flat column arrays (one row per region-tick)"""
+        num_regions = len(self.catalog)
+        rows = num_ticks * num_regions
+        base_pop = np.tile(self.catalog.base_population, num_ticks)
+        base_res = np.tile(self.catalog.base_resources, (num_ticks, 1))
+        gan_output = self._sample(rows)
 
-    def _generate_needs(self, city_name):
-        base = self.city_templates[city_name]["base_resources"]
-        return {k: v * np.random.uniform(0.8, 2.0) for k, v in base.items()}
+        return {
+            "r": np.tile(np.arange(num_regions, dtype=np.int32), num_ticks),
+            "p": (np.abs(gan_output[:, 0] * 50000) + base_pop).astype(np.int32),
+            "b": np.abs(gan_output[:, 1] * 5).astype(np.int32),
+            "s": np.abs(gan_output[:, 2] * 100).astype(np.float32),
+            "w": (base_res * np.random.uniform(0.5, 1.5, (rows, len(RESOURCES)))).astype(np.float32),
+            "q": (base_res * np.random.uniform(0.8, 2.0, (rows, len(RESOURCES)))).astype(np.float32)
+        }
+
+    def generate_bulk(self, num_records, out_dir, batch_size=200000, file_format="npz"):
+        """Stream num_records synthetic region-ticks to chunked files in out_dir"""
+        if file_format == "parquet":
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+        os.makedirs(out_dir, exist_ok=True)
+        ticks_per_chunk = max(1, batch_size // len(self.catalog))
+        written = 0
+        chunk = 0
+        start = time.perf_counter()
+
+        while written < num_records:
+            arrays = self.generate_arrays(ticks_per_chunk)
+            count = min(len(arrays["r"]), num_records - written)
+            arrays = {k: v[:count] for k, v in arrays.items()}
+
+            path = os.path.join(out_dir, f"chunk_{chunk:05d}.{file_format}")
+            if file_format == "parquet":
+                columns = {k: v for k, v in arrays.items() if v.ndim == 1}
+                for key in ("w", "q"):
+                    for i, res in enumerate(RESOURCES):
+                        columns[f"{key}_{res}"] = arrays[key][:, i]
+                pq.write_table(pa.table(columns), path)
+            else:
+                np.savez(path, **arrays)
+
+            written += count
+            chunk += 1
+
+        elapsed = time.perf_counter() - start
+        print(f"Wrote {written:,} region-ticks in {chunk} chunks to {out_dir} "
+              f"({written / elapsed:,.0f} records/sec)")
+        return written
 
     def run(self):
+        start_metrics_server(9101)
+        alerts = None
+        if self.db is not None:
+            alerts = AlertEngine(self.db["alerts"])
+            try:
+                self.snapshots.ensure_indexes()
+            except Exception as e:
+                print(f"Error creating snapshot indexes: {e}")
         while True:
             try:
                 if self.collection is None:
@@ -84,14 +140,29 @@ class GANGenerator:
                     time.sleep(5)
                     continue
                     
-                data = self.generate()
-                self.collection.delete_many({})
-                self.collection.insert_many(data)
+                with timed("generate", batch_size=len(self.catalog)):
+                    data = self.generate()
+                with timed("storage_write", batch_size=len(data)):
+                    self.snapshots.write(data)
+                record_tick("gan_generator", data[0]["t"])
+                if alerts is not None:
+                    with timed("alerts", batch_size=len(data)):
+                        alerts.process(data, data[0]["t"])
                 time.sleep(3)
             except Exception as e:
                 print(f"Error in run loop: {e}")
                 time.sleep(5)
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run the live GAN generator or generate an offline dataset")
+    parser.add_argument("--bulk", type=int, default=0, help="Number of region-ticks to write to disk instead of running live")
+    parser.add_argument("--out", default="bulk_data")
+    parser.add_argument("--batch-size", type=int, default=200000)
+    parser.add_argument("--format", choices=["npz", "parquet"], default="npz")
+    args = parser.parse_args()
+
     gan = GANGenerator()
-    gan.run()
+    if args.bulk:
+        gan.generate_bulk(args.bulk, args.out, batch_size=args.batch_size, file_format=args.format)
+    else:
+        gan.run()
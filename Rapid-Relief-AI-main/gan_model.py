@@ -4,21 +4,26 @@ import numpy as np
 from pymongo import MongoClient
 import time
 from datetime import datetime
+from alerts import AlertEngine
+from metrics import record_tick, start_metrics_server, timed
+from regions import load_catalog
+from schema import encode_tick
+from snapshot import SnapshotStore
+from trends import TrendTracker
 
 class RealisticDataGenerator:
     def __init__(self):
         self.client = MongoClient("mongodb://localhost:27017/")
         self.db = self.client["resource_allocation"]
         self.collection = self.db["synthetic_data"]
+        self.snapshots = SnapshotStore(self.db, "synthetic_data")
+        self.snapshots.ensure_indexes()
+        self.alerts = AlertEngine(self.db["synthetic_alerts"])
+        self.trends = TrendTracker()
         
-        # Initialize base states with realistic parameters
-        self.base_states = {
-            0: {"name": "Delhi", "base_population": 250000, "base_resources": {"food": 2000, "water": 3000, "medical": 1000}},
-            1: {"name": "Mumbai", "base_population": 300000, "base_resources": {"food": 2500, "water": 3500, "medical": 1200}},
-            2: {"name": "Chennai", "base_population": 200000, "base_resources": {"food": 1800, "water": 2800, "medical": 900}},
-            3: {"name": "Hyderabad", "base_population": 180000, "base_resources": {"food": 1600, "water": 2600, "medical": 800}},
-            4: {"name": "Bangalore", "base_population": 220000, "base_resources": {"food": 2000, "water": 3000, "medical": 1000}}
-        }
+        # Initialize base states from the shared region catalog
+        self.catalog = load_catalog()
+        self.base_states = {region_id: self.catalog.region(region_id) for region_id in range(len(self.catalog))}
         
         # Increased resource consumption rates per person per hour
         self.consumption_rates = {
@@ -149,7 +154,7 @@ class RealisticDataGenerator:
                 "timestamp": current_time
             }
             
-            synthetic_data.append(entry)
+            synthetic_data.append(encode_tick(entry))
             
             # Update previous state
             self.previous_states[region_id].update({
@@ -160,15 +165,24 @@ class RealisticDataGenerator:
                 "last_update": current_time
             })
 
+        # Update streaming trend and forecast statistics
+        with timed("trends", batch_size=len(synthetic_data)):
+            self.trends.update(synthetic_data, current_time)
+
         # Update MongoDB
-        self.collection.delete_many({})
-        self.collection.insert_many(synthetic_data)
+        with timed("storage_write", batch_size=len(synthetic_data)):
+            self.snapshots.write(synthetic_data)
+        record_tick("synthetic_data", current_time)
+        with timed("alerts", batch_size=len(synthetic_data)):
+            self.alerts.process(synthetic_data, current_time)
         print(f"Generated realistic data at {current_time}")
 
 def main():
     generator = RealisticDataGenerator()
+    start_metrics_server(9102)
     while True:
-        generator.generate_synthetic_data()
+        with timed("tick"):
+            generator.generate_synthetic_data()
         time.sleep(3)  # Update every 3 seconds
 
 if __name__ == "__main__":
@@ -0,0 +1,238 @@
+# loadtest.py - Stress harness simulating many concurrent dashboard sessions
+
+import argparse
+import random
+import resource
+import threading
+import time
+import traceback
+from collections import Counter
+from datetime import datetime
+
+import numpy as np
+from pymongo import MongoClient, monitoring
+
+from alerts import AlertEngine
+from regions import RESOURCES, load_catalog
+from schema import encode_arrays
+from snapshot import SnapshotStore
+
+READ_COMMANDS = {"find", "aggregate", "getMore", "count", "distinct"}
+WRITE_COMMANDS = {"insert", "update", "delete", "findAndModify"}
+
+# Session exceptions by type across the whole run; the first of each type is printed
+ERROR_COUNTS = Counter()
+ERROR_LOCK = threading.Lock()
+
+
+class CommandCounter(monitoring.CommandListener):
+    """Counts database commands sent by the harness and the dashboard functions"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.counts = Counter()
+
+    def started(self, event):
+        with self.lock:
+            self.counts[event.command_name] += 1
+
+    def succeeded(self, event):
+        pass
+
+    def failed(self, event):
+        pass
+
+    def snapshot(self):
+        with self.lock:
+            return Counter(self.counts)
+
+
+def connect(args, counter):
+    """Local MongoDB, or an in-process mongomock stand-in with --mock"""
+    if args.mock:
+        import mongomock
+        return mongomock.MongoClient()
+    return MongoClient(args.mongo_uri, serverSelectionTimeoutMS=5000, event_listeners=[counter])
+
+
+class Writer(threading.Thread):
+    """Writes random ticks for every catalog region at a fixed rate, like GANGenerator.run"""
+
+    def __init__(self, db, interval):
+        super().__init__(name="writer", daemon=True)
+        self.catalog = load_catalog()
+        self.snapshots = SnapshotStore(db, "gan_data")
+        self.snapshots.ensure_indexes()
+        self.alerts = AlertEngine(db["alerts"])
+        self.interval = interval
+        self.running = True
+        self.ticks = 0
+
+    def tick(self):
+        num_regions = len(self.catalog)
+        arrays = {
+            "r": np.arange(num_regions, dtype=np.int32),
+            "p": (self.catalog.base_population * np.random.uniform(0.9, 1.3, num_regions)).astype(np.int32),
+            "b": np.random.randint(0, 5, num_regions).astype(np.int32),
+            "s": np.random.uniform(0, 100, num_regions).astype(np.float32),
+            "w": (self.catalog.base_resources * np.random.uniform(0.5, 1.5, (num_regions, len(RESOURCES)))).astype(np.float32),
+            "q": (self.catalog.base_resources * np.random.uniform(0.8, 2.0, (num_regions, len(RESOURCES)))).astype(np.float32)
+        }
+        timestamp = datetime.now()
+        docs = encode_arrays(arrays, timestamp)
+        self.snapshots.write(docs)
+        self.alerts.process(docs, timestamp)
+        self.ticks += 1
+
+    def run(self):
+        while self.running:
+            start = time.perf_counter()
+            try:
+                self.tick()
+            except Exception as e:
+                print(f"Error in writer: {e}")
+            time.sleep(max(0.0, self.interval - (time.perf_counter() - start)))
+
+
+class Session(threading.Thread):
+    """One operator's dashboard session: load data, build every figure, wait, rerun"""
+
+    def __init__(self, dashboard, refresh_interval, stop_event):
+        super().__init__(daemon=True)
+        self.dashboard = dashboard
+        self.refresh_interval = refresh_interval
+        self.stop_event = stop_event
+        self.latencies = []
+        self.errors = Counter()
+        # Each session picks its own map view, as operators would
+        self.view_type = random.choice(list(dashboard.COLOR_MAPPINGS))
+
+    def refresh(self):
+        dashboard = self.dashboard
+        df = dashboard.load_data()
+        if df.empty:
+            return
+        dashboard.load_alerts()
+        # Map controls are passed explicitly: outside `streamlit run` st.session_state is not kept
+        dashboard.create_map(
+            df,
+            view_type=self.view_type,
+            zoom=dashboard.DEFAULT_MAP_ZOOM,
+            center=dashboard.DEFAULT_MAP_CENTER
+        )
+        dashboard.px.bar(df, x='region_name', y='severity_score', color='severity_score',
+                         color_continuous_scale='RdYlGn_r', title='Regional Severity Scores')
+        dashboard.create_resource_chart(df)
+        dashboard.calculate_resource_recommendations(df)
+
+    def run(self):
+        # Sessions don't open at the same instant
+        self.stop_event.wait(random.uniform(0, self.refresh_interval))
+        while not self.stop_event.is_set():
+            start = time.perf_counter()
+            try:
+                self.refresh()
+            except Exception as e:
+                name = type(e).__name__
+                with ERROR_LOCK:
+                    if not ERROR_COUNTS[name]:
+                        print(f"Session error ({name}):")
+                        traceback.print_exc()
+                    ERROR_COUNTS[name] += 1
+                self.errors[name] += 1
+            else:
+                # Only completed refreshes count towards the latency percentiles
+                self.latencies.append(time.perf_counter() - start)
+            latency = time.perf_counter() - start
+            self.stop_event.wait(max(0.0, self.refresh_interval - latency))
+
+
+def cpu_seconds():
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    return usage.ru_utime + usage.ru_stime
+
+
+def rss_mb():
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss / 2 ** 20
+    except ImportError:
+        # ru_maxrss is the peak, in KiB on Linux
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def run_level(dashboard, num_sessions, duration, refresh_interval, counter):
+    """Run num_sessions concurrent sessions for duration seconds and summarize"""
+    stop_event = threading.Event()
+    sessions = [Session(dashboard, refresh_interval, stop_event) for _ in range(num_sessions)]
+
+    commands_before = counter.snapshot()
+    cpu_before = cpu_seconds()
+    start = time.perf_counter()
+    for session in sessions:
+        session.start()
+    time.sleep(duration)
+    stop_event.set()
+    for session in sessions:
+        session.join()
+    elapsed = time.perf_counter() - start
+
+    commands = counter.snapshot() - commands_before
+    latencies = np.array([lat for session in sessions for lat in session.latencies]) * 1000
+    return {
+        "sessions": num_sessions,
+        "refreshes": len(latencies),
+        "errors": sum((session.errors for session in sessions), Counter()),
+        "p50": np.percentile(latencies, 50) if len(latencies) else float("nan"),
+        "p95": np.percentile(latencies, 95) if len(latencies) else float("nan"),
+        "p99": np.percentile(latencies, 99) if len(latencies) else float("nan"),
+        "cpu": (cpu_seconds() - cpu_before) / elapsed * 100,
+        "rss": rss_mb(),
+        "reads": sum(commands[name] for name in READ_COMMANDS) / elapsed,
+        "writes": sum(commands[name] for name in WRITE_COMMANDS) / elapsed
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Simulate concurrent dashboard sessions against a writer")
+    parser.add_argument("--sessions", default="1,5,10,25,50", help="Comma-separated session counts to test")
+    parser.add_argument("--duration", type=float, default=30, help="Seconds per session count")
+    parser.add_argument("--refresh-interval", type=float, default=3, help="Seconds between reruns of a session")
+    parser.add_argument("--tick-interval", type=float, default=3, help="Seconds between writer ticks")
+    parser.add_argument("--mongo-uri", default="mongodb://localhost:27017/")
+    parser.add_argument("--database", default="rrai_loadtest")
+    parser.add_argument("--mock", action="store_true", help="Use an in-process mongomock database")
+    args = parser.parse_args()
+
+    counter = CommandCounter()
+    client = connect(args, counter)
+    db = client[args.database]
+
+    writer = Writer(db, args.tick_interval)
+    writer.tick()
+    writer.start()
+
+    # The dashboard module runs in Streamlit's bare mode; point it at the load-test database
+    import dashboard
+    dashboard.synthetic_collection = db["gan_data"]
+    dashboard.synthetic_snapshots = SnapshotStore(db, "gan_data")
+    dashboard.alerts_collection = db["alerts"]
+
+    print(f"{len(load_catalog())} regions, writer every {args.tick_interval}s, "
+          f"sessions refresh every {args.refresh_interval}s"
+          + (" (mongomock: query rates not available)" if args.mock else ""))
+    print(f"{'sessions':>8} {'refreshes':>9} {'errors':>6} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} "
+          f"{'cpu %':>6} {'rss MB':>7} {'reads/s':>8} {'writes/s':>8}")
+    for num_sessions in [int(n) for n in args.sessions.split(",")]:
+        result = run_level(dashboard, num_sessions, args.duration, args.refresh_interval, counter)
+        print(f"{result['sessions']:>8} {result['refreshes']:>9} {sum(result['errors'].values()):>6} "
+              f"{result['p50']:>8.1f} {result['p95']:>8.1f} {result['p99']:>8.1f} "
+              f"{result['cpu']:>6.0f} {result['rss']:>7.0f} {result['reads']:>8.1f} {result['writes']:>8.1f}")
+        if result['errors']:
+            print("         errors: " + ", ".join(f"{name} x{count}" for name, count in result['errors'].most_common()))
+
+    writer.running = False
+
+
+if __name__ == "__main__":
+    main()
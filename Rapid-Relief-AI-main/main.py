@@ -1,16 +1,18 @@
 import random
 from pymongo import MongoClient
+from regions import load_catalog
+from schema import encode_tick
 
 client = MongoClient("mongodb://localhost:27017/")
 db = client["resource_allocation"]
 initial_data_collection = db["initial_data"]
 
 # Generate initial data
-regions = ["Region_0", "Region_1", "Region_2", "Region_3", "Region_4", "Region_5", "Region_6", "Region_7", "Region_8", "Region_9"]
+regions = load_catalog()
 
 def generate_initial_data():
     data = []
-    for region_id in range(5):  # Limiting to 5 regions
+    for region_id in range(len(regions)):  # One entry per catalog region
         region_data = {
             "region_id": region_id,
             "population_density": random.randint(100, 1000),
@@ -22,7 +24,7 @@ def generate_initial_data():
                 "medical": random.randint(100, 1000)
             }
         }
-        data.append(region_data)
+        data.append(encode_tick(region_data))
     initial_data_collection.insert_many(data)
 
 if __name__ == "__main__":
@@ -0,0 +1,223 @@
+# metrics.py - Low-overhead pipeline instrumentation with a local Prometheus-format endpoint
+
+import bisect
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+SIZE_BUCKETS = (1, 5, 10, 50, 100, 500, 1000, 5000, 10000, 50000, 100000)
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus style"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+
+class Registry:
+    """Holds all histograms, counters and gauges of the process"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.histograms = {}
+        self.counters = {}
+        self.gauges = {}
+
+    def observe(self, name, value, buckets=LATENCY_BUCKETS, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.histograms.get(key)
+            if histogram is None:
+                histogram = self.histograms[key] = Histogram(buckets)
+            histogram.observe(value)
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def set(self, name, value, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.gauges[key] = value
+
+    def render(self):
+        """Render all metrics in the Prometheus text exposition format"""
+        lines = []
+        with self.lock:
+            for kind, metrics in (("counter", self.counters), ("gauge", self.gauges)):
+                for name in sorted({name for name, _ in metrics}):
+                    lines.append(f"# TYPE {name} {kind}")
+                    for (metric, labels), value in metrics.items():
+                        if metric == name:
+                            lines.append(f"{name}{_format_labels(labels)} {value}")
+
+            for name in sorted({name for name, _ in self.histograms}):
+                lines.append(f"# TYPE {name} histogram")
+                for (metric, labels), histogram in self.histograms.items():
+                    if metric != name:
+                        continue
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets, histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{_format_labels(labels + (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_bucket{_format_labels(labels + (('le', '+Inf'),))} {histogram.count}")
+                    lines.append(f"{name}_sum{_format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{_format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+REGISTRY = Registry()
+
+
+@contextmanager
+def timed(stage, batch_size=None):
+    """Record the latency (and optional batch size) of a pipeline stage, counting errors"""
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        REGISTRY.inc("rrai_errors_total", stage=stage)
+        raise
+    finally:
+        REGISTRY.observe("rrai_stage_seconds", time.perf_counter() - start, stage=stage)
+        if batch_size is not None:
+            REGISTRY.observe("rrai_batch_size", batch_size, buckets=SIZE_BUCKETS, stage=stage)
+
+
+def record_tick(source, timestamp):
+    """Count a written or read tick and record how old its data is"""
+    REGISTRY.inc("rrai_ticks_total", source=source)
+    if timestamp is not None:
+        REGISTRY.set("rrai_tick_lag_seconds", (datetime.now() - timestamp).total_seconds(), source=source)
+
+
+class SamplingProfiler:
+    """Samples the stacks of all threads at a fixed interval while enabled"""
+
+    def __init__(self, interval=0.01):
+        self.interval = interval
+        self.samples = Counter()
+        self.lock = threading.Lock()
+        self.control_lock = threading.Lock()
+        self.thread = None
+        self.running = False
+
+    def start(self):
+        with self.control_lock:
+            if self.thread is not None and self.thread.is_alive():
+                return
+            self.running = True
+            self.thread = threading.Thread(target=self._sample, name="sampling-profiler", daemon=True)
+            self.thread.start()
+
+    def stop(self):
+        # Wait for the sampler to exit so a quick restart never runs two samplers
+        with self.control_lock:
+            self.running = False
+            if self.thread is not None:
+                self.thread.join()
+                self.thread = None
+
+    def _sample(self):
+        own_id = threading.get_ident()
+        while self.running:
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id == own_id:
+                    continue
+                stack = []
+                while frame is not None:
+                    code = frame.f_code
+                    stack.append(f"{os.path.basename(code.co_filename)}:{code.co_name}")
+                    frame = frame.f_back
+                with self.lock:
+                    self.samples[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+    def collapsed(self):
+        """Samples in collapsed-stack format (usable with flamegraph tools)"""
+        with self.lock:
+            samples = self.samples.most_common()
+        return "".join(f"{stack} {count}\n" for stack, count in samples)
+
+    def reset(self):
+        with self.lock:
+            self.samples.clear()
+
+
+PROFILER = SamplingProfiler()
+
+
+class MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path == "/metrics":
+            body = REGISTRY.render()
+        elif self.path == "/profile":
+            body = PROFILER.collapsed()
+        elif self.path == "/profile/start":
+            PROFILER.start()
+            body = "profiler started\n"
+        elif self.path == "/profile/stop":
+            PROFILER.stop()
+            body = "profiler stopped\n"
+        elif self.path == "/profile/reset":
+            PROFILER.reset()
+            body = "profiler reset\n"
+        else:
+            self.send_error(404)
+            return
+        payload = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_server = None
+
+
+def start_metrics_server(port):
+    """Serve /metrics and the profiler toggles on localhost (once per process).
+
+    RRAI_METRICS_PORT overrides the port and RRAI_PROFILE=1 starts the profiler immediately.
+    """
+    global _server
+    if _server is not None:
+        return _server or None
+    port = int(os.environ.get("RRAI_METRICS_PORT", port))
+    try:
+        _server = ThreadingHTTPServer(("127.0.0.1", port), MetricsHandler)
+    except OSError as e:
+        print(f"Could not start metrics server on port {port}: {e}")
+        _server = False
+        return None
+    threading.Thread(target=_server.serve_forever, name="metrics-server", daemon=True).start()
+    if os.environ.get("RRAI_PROFILE") == "1":
+        PROFILER.start()
+    print(f"Metrics available at http://127.0.0.1:{port}/metrics")
+    return _server
@@ -0,0 +1,53 @@
+# regions.py - Shared region catalog loaded from regions.json
+
+import json
+import os
+from functools import lru_cache
+
+import numpy as np
+
+# Resources are stored as fixed-order numeric arrays in this order
+RESOURCES = ("food", "water", "medical")
+
+CATALOG_PATH = os.environ.get(
+    "RRAI_REGION_CATALOG",
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "regions.json")
+)
+
+
+class RegionCatalog:
+    """Column-oriented region table indexed by region_id (the position in the catalog file)"""
+
+    def __init__(self, regions):
+        self.names = [region["name"] for region in regions]
+        self.index = {name: region_id for region_id, name in enumerate(self.names)}
+        self.lat = np.array([region["lat"] for region in regions], dtype=np.float64)
+        self.lon = np.array([region["lon"] for region in regions], dtype=np.float64)
+        self.base_population = np.array([region["base_population"] for region in regions], dtype=np.float64)
+        self.base_resources = np.array(
+            [[region["base_resources"][res] for res in RESOURCES] for region in regions],
+            dtype=np.float64
+        ).reshape(len(regions), len(RESOURCES))
+
+    def __len__(self):
+        return len(self.names)
+
+    def name_of(self, region_id):
+        if 0 <= region_id < len(self.names):
+            return self.names[region_id]
+        return f"Region_{region_id}"
+
+    def region(self, region_id):
+        """Full record for one region, in the shape the generators use"""
+        return {
+            "name": self.names[region_id],
+            "base_population": float(self.base_population[region_id]),
+            "base_resources": {res: float(self.base_resources[region_id, i]) for i, res in enumerate(RESOURCES)}
+        }
+
+
+@lru_cache(maxsize=None)
+def load_catalog(path=CATALOG_PATH):
+    """Load and cache the region catalog"""
+    with open(path) as f:
+        return RegionCatalog(json.load(f)["regions"])
@@ -0,0 +1,167 @@
+# schema.py - Compact, versioned document schema for region ticks
+
+import time
+from regions import RESOURCES, load_catalog
+
+SCHEMA_VERSION = 1
+
+# Short field names used in stored documents; encode_tick/decode_tick are the only mapping.
+#   v    schema version
+#   r    region id (names are resolved from regions.json)
+#   p    population density
+#   b    road block status
+#   s    severity score
+#   w    warehouse stock, [food, water, medical]
+#   q    resource needs, [food, water, medical]
+#   t    timestamp
+#   sv   snapshot version, set by snapshot.SnapshotStore
+#   ec   consumption EWMA per hour, [food, water, medical], set by trends.TrendTracker
+#   ss   severity slope in points per minute, set by trends.TrendTracker
+#   eta  hours until stock-out, [food, water, medical], set by trends.TrendTracker
+
+
+def region_name(region_id):
+    """Resolve a region name from its id; names are not stored per document"""
+    return load_catalog().name_of(region_id)
+
+
+def encode_resources(values):
+    """Pack a resource dict (or a single number for all resources) into a fixed-order list"""
+    if isinstance(values, dict):
+        return [float(values.get(res, 0)) for res in RESOURCES]
+    return [float(values)] * len(RESOURCES)
+
+
+def decode_resources(values):
+    """Unpack a fixed-order resource list into a dict"""
+    return {res: values[i] for i, res in enumerate(RESOURCES)}
+
+
+def encode_tick(record):
+    """Convert a full region record into a compact document"""
+    doc = {
+        "v": SCHEMA_VERSION,
+        "r": int(record["region_id"]),
+        "p": int(record["population_density"]),
+        "b": int(record["road_block_status"])
+    }
+    if record.get("severity_score") is not None:
+        doc["s"] = float(record["severity_score"])
+    if "warehouse_stock_status" in record:
+        doc["w"] = encode_resources(record["warehouse_stock_status"])
+    if "resource_needs" in record:
+        doc["q"] = encode_resources(record["resource_needs"])
+    if "timestamp" in record:
+        doc["t"] = record["timestamp"]
+    return doc
+
+
+def encode_arrays(arrays, timestamp):
+    """Build compact documents from column arrays keyed by short field names (one row per region)"""
+    columns = {key: values.tolist() for key, values in arrays.items()}
+    docs = []
+    for idx in range(len(columns["r"])):
+        doc = {"v": SCHEMA_VERSION}
+        for key, values in columns.items():
+            doc[key] = values[idx]
+        doc["t"] = timestamp
+        docs.append(doc)
+    return docs
+
+
+def decode_tick(doc):
+    """Convert a compact document back into a full region record"""
+    if "v" not in doc:
+        # Legacy document written before the compact schema
+        return legacy_record(doc)
+
+    record = {
+        "region_id": doc["r"],
+        "region_name": region_name(doc["r"]),
+        "population_density": doc["p"],
+        "road_block_status": doc["b"]
+    }
+    if "s" in doc:
+        record["severity_score"] = doc["s"]
+    if "w" in doc:
+        record["warehouse_stock_status"] = decode_resources(doc["w"])
+    if "q" in doc:
+        record["resource_needs"] = decode_resources(doc["q"])
+    if "t" in doc:
+        record["timestamp"] = doc["t"]
+    if "ec" in doc:
+        record["consumption_ewma"] = decode_resources(doc["ec"])
+    if "ss" in doc:
+        record["severity_slope"] = doc["ss"]
+    if "eta" in doc:
+        record["stockout_eta_hours"] = decode_resources(doc["eta"])
+    return record
+
+
+def legacy_record(doc):
+    """Normalize a legacy document into the full record shape"""
+    record = {k: v for k, v in doc.items() if k != "_id"}
+    record.setdefault("region_name", region_name(record["region_id"]))
+    for key in ("warehouse_stock_status", "resource_needs"):
+        if key in record:
+            record[key] = decode_resources(encode_resources(record[key]))
+    return record
+
+
+def migrate_collection(collection, batch_size=1000):
+    """Rewrite legacy documents of a collection into the compact schema"""
+    from pymongo import ReplaceOne
+
+    migrated = 0
+    operations = []
+    for doc in collection.find({"v": {"$exists": False}}):
+        operations.append(ReplaceOne({"_id": doc["_id"]}, encode_tick(legacy_record(doc))))
+        if len(operations) >= batch_size:
+            collection.bulk_write(operations, ordered=False)
+            migrated += len(operations)
+            operations = []
+    if operations:
+        collection.bulk_write(operations, ordered=False)
+        migrated += len(operations)
+
+    collection.create_index([("t", -1)])
+    collection.create_index([("r", 1)])
+    return migrated
+
+
+def measure(collection):
+    """Return average BSON document size and load+decode time for a collection"""
+    import bson
+
+    start = time.perf_counter()
+    docs = list(collection.find())
+    records = [decode_tick(doc) for doc in docs]
+    elapsed = time.perf_counter() - start
+
+    sizes = [len(bson.encode(doc)) for doc in docs]
+    return {
+        "documents": len(records),
+        "avg_bytes": sum(sizes) / len(sizes) if sizes else 0,
+        "total_bytes": sum(sizes),
+        "load_seconds": elapsed
+    }
+
+
+def main():
+    from pymongo import MongoClient
+
+    client = MongoClient("mongodb://localhost:27017/")
+    db = client["resource_allocation"]
+    for name in ("initial_data", "synthetic_data", "gan_data"):
+        collection = db[name]
+        before = measure(collection)
+        migrated = migrate_collection(collection)
+        after = measure(collection)
+        print(f"{name}: migrated {migrated} documents")
+        print(f"  avg size {before['avg_bytes']:.0f} -> {after['avg_bytes']:.0f} bytes, "
+              f"total {before['total_bytes']} -> {after['total_bytes']} bytes")
+        print(f"  load+decode {before['load_seconds'] * 1000:.1f} -> {after['load_seconds'] * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
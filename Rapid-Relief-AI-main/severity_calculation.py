@@ -1,19 +1,23 @@
 from pymongo import MongoClient
+from metrics import timed
+from schema import decode_tick
 
 client = MongoClient("mongodb://localhost:27017/")
 db = client["resource_allocation"]
 collection = db["initial_data"]
 
 def calculate_severity():
-    for entry in collection.find():
-        population_density = entry["population_density"]
-        road_block_status = entry["road_block_status"]
-        severity_score = population_density * (1.5 if road_block_status else 1.0)
-        
-        collection.update_one(
-            {"region_id": entry["region_id"]},
-            {"$set": {"severity_score": severity_score}}
-        )
+    with timed("severity"):
+        for doc in collection.find():
+            entry = decode_tick(doc)
+            population_density = entry["population_density"]
+            road_block_status = entry["road_block_status"]
+            severity_score = population_density * (1.5 if road_block_status else 1.0)
+            
+            collection.update_one(
+                {"_id": doc["_id"]},
+                {"$set": {"s": float(severity_score)}}
+            )
     print("Severity scores calculated and updated in MongoDB.")
 
 if __name__ == "__main__":
@@ -0,0 +1,107 @@
+# snapshot.py - Atomic, versioned snapshots for the "current state" collections
+
+import threading
+import time
+from datetime import datetime
+
+from pymongo import ReturnDocument
+
+
+class SnapshotStore:
+    """Current-state collection where every tick is written under a new snapshot version.
+
+    Documents are tagged with the version ("sv") and become visible only when the single
+    pointer document in the "snapshots" collection is moved to that version, so readers
+    always see one complete tick. Old versions are deleted by a background thread.
+    """
+
+    def __init__(self, db, name, keep_versions=3, version_ttl=1.0):
+        self.name = name
+        self.collection = db[name]
+        self.pointers = db["snapshots"]
+        self.keep_versions = keep_versions
+        # Readers reuse the pointer for version_ttl seconds, so most reads are a single query.
+        # Keep it well below keep_versions ticks so a cached version is never collected.
+        self.version_ttl = version_ttl
+        self._cached_version = None
+        self._cached_at = 0.0
+        self._gc_event = threading.Event()
+        self._gc_thread = None
+
+    def ensure_indexes(self):
+        self.collection.create_index([("sv", 1), ("r", 1)])
+        self.collection.create_index([("t", -1)])
+
+    def current_version(self):
+        pointer = self.pointers.find_one({"_id": self.name}, {"version": 1})
+        if pointer is None:
+            return None
+        return pointer.get("version")
+
+    def write(self, docs):
+        """Write one tick under a new version and atomically make it current"""
+        pointer = self.pointers.find_one_and_update(
+            {"_id": self.name},
+            {"$inc": {"next_version": 1}},
+            upsert=True,
+            return_document=ReturnDocument.AFTER
+        )
+        version = pointer["next_version"]
+
+        for doc in docs:
+            doc["sv"] = version
+        self.collection.insert_many(docs)
+
+        # Single-document update: readers see either the old or the new version, never a mix
+        self.pointers.update_one(
+            {"_id": self.name},
+            {"$max": {"version": version}, "$set": {"updated": datetime.now()}}
+        )
+
+        self._start_gc()
+        self._gc_event.set()
+        return version
+
+    def _reader_version(self, refresh=False):
+        now = time.monotonic()
+        if refresh or self._cached_version is None or now - self._cached_at > self.version_ttl:
+            self._cached_version = self.current_version()
+            self._cached_at = now
+        return self._cached_version
+
+    def read(self, projection=None):
+        """All documents of the current version (legacy unversioned documents if none yet)"""
+        version = self._reader_version()
+        if version is None:
+            return list(self.collection.find({"sv": {"$exists": False}}, projection))
+        docs = list(self.collection.find({"sv": version}, projection))
+        if not docs:
+            # Cached version already collected; fall back to the live pointer
+            version = self._reader_version(refresh=True)
+            docs = list(self.collection.find({"sv": version}, projection))
+        return docs
+
+    def collect_garbage(self):
+        """Delete versions older than the last keep_versions and any unversioned documents"""
+        version = self.current_version()
+        if version is None:
+            return 0
+        result = self.collection.delete_many({"$or": [
+            {"sv": {"$lte": version - self.keep_versions}},
+            {"sv": {"$exists": False}}
+        ]})
+        return result.deleted_count
+
+    def _start_gc(self):
+        if self._gc_thread is None:
+            self._gc_thread = threading.Thread(target=self._gc_loop, name=f"{self.name}-gc", daemon=True)
+            self._gc_thread.start()
+
+    def _gc_loop(self):
+        while True:
+            self._gc_event.wait()
+            self._gc_event.clear()
+            try:
+                self.collect_garbage()
+            except Exception as e:
+                print(f"Error collecting old snapshots of {self.name}: {e}")
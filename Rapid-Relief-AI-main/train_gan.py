@@ -1,13 +1,60 @@
+import argparse
+import time
 import numpy as np
-from gan_generator import GANGenerator
+from gan_generator import GANGenerator, NOISE_DIM, NUM_METRICS
 import tensorflow as tf
-from tensorflow.keras.callbacks import EarlyStopping, ModelCheckpoint
 
-def quick_train():
-    input_shape = 5
-    output_shape = 15
+CHECKPOINT_DIR = "gan_checkpoints"
+
+def configure_threads(intra_op_threads=0, inter_op_threads=0):
+    """Set TensorFlow thread pools (0 lets TensorFlow pick based on available cores)"""
+    tf.config.threading.set_intra_op_parallelism_threads(intra_op_threads)
+    tf.config.threading.set_inter_op_parallelism_threads(inter_op_threads)
+
+def make_dataset(X, Y, batch_size):
+    """Shuffled, batched and prefetched pipeline over the (noise, real) pairs"""
+    dataset = tf.data.Dataset.from_tensor_slices((X.astype(np.float32), Y.astype(np.float32)))
+    dataset = dataset.shuffle(len(X), reshuffle_each_iteration=True)
+    dataset = dataset.batch(batch_size, drop_remainder=True)
+    return dataset.prefetch(tf.data.AUTOTUNE)
+
+def make_train_step(gan, d_optimizer, g_optimizer):
+    """Build a compiled step that updates the discriminator, then the generator"""
+    cross_entropy = tf.keras.losses.BinaryCrossentropy()
+
+    @tf.function
+    def train_step(noise, real_data):
+        # Train discriminator
+        with tf.GradientTape() as d_tape:
+            fake_data = gan.generator(noise, training=True)
+            real_output = gan.discriminator(real_data, training=True)
+            d_fake_output = gan.discriminator(fake_data, training=True)
+            d_loss = 0.5 * (cross_entropy(tf.ones_like(real_output), real_output) +
+                            cross_entropy(tf.zeros_like(d_fake_output), d_fake_output))
+        d_grads = d_tape.gradient(d_loss, gan.discriminator.trainable_variables)
+        d_optimizer.apply_gradients(zip(d_grads, gan.discriminator.trainable_variables))
+
+        # Train generator; only generator weights are updated, the discriminator stays frozen
+        with tf.GradientTape() as g_tape:
+            fake_output = gan.discriminator(gan.generator(noise, training=True), training=False)
+            g_loss = cross_entropy(tf.ones_like(fake_output), fake_output)
+        g_grads = g_tape.gradient(g_loss, gan.generator.trainable_variables)
+        g_optimizer.apply_gradients(zip(g_grads, gan.generator.trainable_variables))
+
+        d_acc = 0.5 * (tf.reduce_mean(tf.cast(real_output > 0.5, tf.float32)) +
+                       tf.reduce_mean(tf.cast(d_fake_output < 0.5, tf.float32)))
+        return d_loss, g_loss, d_acc
+
+    return train_step
+
+def quick_train(epochs=10, batch_size=32, intra_op_threads=0, inter_op_threads=0,
+                checkpoint_dir=CHECKPOINT_DIR, resume=True):
+    configure_threads(intra_op_threads, inter_op_threads)
+
+    input_shape = NOISE_DIM
+    output_shape = NUM_METRICS  # Per-region metrics; regions are generated as a batch
     num_samples = 10000  # Increased dataset size
-    
+
     # Generate correlated features with cluster separation
     X = np.concatenate([
         np.random.normal(0, 1, (num_samples//2, input_shape)),
@@ -17,48 +64,69 @@ def quick_train():
         np.random.normal(0, 1, (num_samples//2, output_shape)),
         np.random.normal(2, 0.7, (num_samples//2, output_shape))
     ])
-    
-    gan = GANGenerator()
-    
-    # Compile networks
-    gan.discriminator.compile(
-        loss='binary_crossentropy', 
-        optimizer=tf.keras.optimizers.Adam(0.0002, 0.5),
-        metrics=['accuracy']
-    )
-    
-    gan.combined.compile(
-        loss='binary_crossentropy', 
-        optimizer=tf.keras.optimizers.Adam(0.0002, 0.5)
+
+    gan = GANGenerator(load_weights=False)
+    dataset = make_dataset(X, Y, batch_size)
+
+    d_optimizer = tf.keras.optimizers.Adam(0.0002, 0.5)
+    g_optimizer = tf.keras.optimizers.Adam(0.0002, 0.5)
+    train_step = make_train_step(gan, d_optimizer, g_optimizer)
+
+    # Checkpointing
+    epoch_counter = tf.Variable(0, dtype=tf.int64)
+    checkpoint = tf.train.Checkpoint(
+        generator=gan.generator,
+        discriminator=gan.discriminator,
+        d_optimizer=d_optimizer,
+        g_optimizer=g_optimizer,
+        epoch=epoch_counter
     )
-    
-    # Training parameters
-    batch_size = 32
-    epochs = 100
-    
+    manager = tf.train.CheckpointManager(checkpoint, checkpoint_dir, max_to_keep=3)
+    if resume and manager.latest_checkpoint:
+        checkpoint.restore(manager.latest_checkpoint)
+        print(f"Resumed from {manager.latest_checkpoint} (epoch {int(epoch_counter.numpy())})")
+
     # Training loop
-    for epoch in range(epochs):
-        # Train discriminator
-        idx = np.random.randint(0, X.shape[0], batch_size)
-        real_data = Y[idx]
-        fake_data = gan.generator.predict(X[idx], verbose=0)
-        
-        d_loss_real = gan.discriminator.train_on_batch(real_data, np.ones((batch_size, 1)))
-        d_loss_fake = gan.discriminator.train_on_batch(fake_data, np.zeros((batch_size, 1)))
-        d_loss = 0.5 * np.add(d_loss_real, d_loss_fake)
-        
-        # Train generator
-        g_loss = gan.combined.train_on_batch(X[idx], np.ones((batch_size, 1)))
-        
+    for epoch in range(int(epoch_counter.numpy()), epochs):
+        step_times = []
+        epoch_start = time.perf_counter()
+        for noise, real_data in dataset:
+            step_start = time.perf_counter()
+            d_loss, g_loss, d_acc = train_step(noise, real_data)
+            step_times.append(time.perf_counter() - step_start)
+        epoch_time = time.perf_counter() - epoch_start
+
+        epoch_counter.assign(epoch + 1)
+        manager.save()
+
         # Print progress
-        if epoch % 10 == 0:
-            print(f"Epoch {epoch + 1}/{epochs} | D Loss: {d_loss[0]:.4f} | G Loss: {g_loss:.4f} | D Acc: {d_loss[1]:.2f}")
-    
+        samples_per_sec = len(step_times) * batch_size / epoch_time
+        step_ms = np.array(step_times) * 1000
+        print(f"Epoch {epoch + 1}/{epochs} | D Loss: {float(d_loss):.4f} | G Loss: {float(g_loss):.4f} | "
+              f"D Acc: {float(d_acc):.2f} | {samples_per_sec:,.0f} samples/sec | "
+              f"step {step_ms.mean():.2f} ms avg, {np.percentile(step_ms, 95):.2f} ms p95")
+
     # Save weights
     gan.generator.save_weights('gan_generator_weights.h5')
     gan.discriminator.save_weights('gan_discriminator_weights.h5')
     print("Training completed. Weights saved.")
 
 if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the GAN generator")
+    parser.add_argument("--epochs", type=int, default=10)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--intra-op-threads", type=int, default=0)
+    parser.add_argument("--inter-op-threads", type=int, default=0)
+    parser.add_argument("--checkpoint-dir", default=CHECKPOINT_DIR)
+    parser.add_argument("--no-resume", action="store_true", help="Start from scratch instead of the latest checkpoint")
+    args = parser.parse_args()
+
     tf.get_logger().setLevel('ERROR')
-    quick_train()
+    quick_train(
+        epochs=args.epochs,
+        batch_size=args.batch_size,
+        intra_op_threads=args.intra_op_threads,
+        inter_op_threads=args.inter_op_threads,
+        checkpoint_dir=args.checkpoint_dir,
+        resume=not args.no_resume
+    )
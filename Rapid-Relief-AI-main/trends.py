@@ -0,0 +1,90 @@
+# trends.py - Streaming per-region trend and forecast statistics maintained by the writers
+
+import numpy as np
+from regions import RESOURCES
+
+
+class TrendTracker:
+    """O(1)-per-region streaming statistics, updated once per tick and stored on each document.
+
+    Only meaningful for writers whose state evolves from tick to tick (RealisticDataGenerator);
+    for independently resampled ticks the trends would be fitted to noise.
+
+    - "ec":  exponentially weighted moving average of consumption per hour, per resource
+    - "ss":  exponentially weighted severity slope, in score points per minute
+    - "eta": Holt (level + trend) forecast of hours until each resource's stock runs out
+             (infinity when stock is not trending down)
+    """
+
+    def __init__(self, alpha=0.3, beta=0.2):
+        self.alpha = alpha  # Smoothing for consumption, severity slope and stock level
+        self.beta = beta    # Smoothing for the stock trend
+        self.seen = np.zeros(0, dtype=bool)
+        self.last_time = None
+        self.stock = np.zeros((0, len(RESOURCES)))
+        self.severity = np.zeros(0)
+        self.consumption = np.zeros((0, len(RESOURCES)))
+        self.severity_slope = np.zeros(0)
+        self.level = np.zeros((0, len(RESOURCES)))
+        self.trend = np.zeros((0, len(RESOURCES)))
+
+    def _ensure_regions(self, count):
+        if count <= len(self.seen):
+            return
+        extra = count - len(self.seen)
+        self.seen = np.concatenate([self.seen, np.zeros(extra, dtype=bool)])
+        self.severity = np.concatenate([self.severity, np.zeros(extra)])
+        self.severity_slope = np.concatenate([self.severity_slope, np.zeros(extra)])
+        for name in ("stock", "consumption", "level", "trend"):
+            setattr(self, name, np.vstack([getattr(self, name), np.zeros((extra, len(RESOURCES)))]))
+
+    def update(self, docs, timestamp):
+        """Fold one tick of compact documents into the statistics and annotate each document"""
+        if not docs:
+            return docs
+        ids = np.array([doc["r"] for doc in docs], dtype=np.int64)
+        stock = np.array([doc["w"] for doc in docs], dtype=np.float64).reshape(len(docs), len(RESOURCES))
+        severity = np.array([doc.get("s", 0.0) for doc in docs], dtype=np.float64)
+        self._ensure_regions(int(ids.max()) + 1)
+
+        hours = 0.0
+        if self.last_time is not None:
+            hours = (timestamp - self.last_time).total_seconds() / 3600.0
+        self.last_time = timestamp
+
+        new = ~self.seen[ids]
+        if hours > 0:
+            # Consumption is the observed stock drop; replenishments count as zero consumption
+            consumption = np.clip(self.stock[ids] - stock, 0, None) / hours
+            slope = (severity - self.severity[ids]) / (hours * 60)
+            self.consumption[ids] = np.where(
+                new[:, None], consumption, self.alpha * consumption + (1 - self.alpha) * self.consumption[ids]
+            )
+            self.severity_slope[ids] = np.where(
+                new, 0.0, self.alpha * slope + (1 - self.alpha) * self.severity_slope[ids]
+            )
+
+            # Holt's linear method on stock levels, with the trend expressed per hour
+            forecast = self.level[ids] + self.trend[ids] * hours
+            level = self.alpha * stock + (1 - self.alpha) * forecast
+            trend = self.beta * (level - self.level[ids]) / hours + (1 - self.beta) * self.trend[ids]
+            self.level[ids] = np.where(new[:, None], stock, level)
+            self.trend[ids] = np.where(new[:, None], 0.0, trend)
+        else:
+            self.level[ids] = np.where(new[:, None], stock, self.level[ids])
+
+        self.stock[ids] = stock
+        self.severity[ids] = severity
+        self.seen[ids] = True
+
+        with np.errstate(divide="ignore", invalid="ignore"):
+            eta = np.where(self.trend[ids] < 0, np.maximum(self.level[ids], 0) / -self.trend[ids], np.inf)
+
+        consumption = self.consumption[ids].tolist()
+        slopes = self.severity_slope[ids].tolist()
+        etas = eta.tolist()
+        for idx, doc in enumerate(docs):
+            doc["ec"] = consumption[idx]
+            doc["ss"] = slopes[idx]
+            doc["eta"] = etas[idx]
+        return docs